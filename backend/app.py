@@ -1,16 +1,70 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from flask_compress import Compress
 import os
+import re
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import google.generativeai as genai
 
 # ------------------ CONFIG ------------------
 FAKESTORE_API = "https://fakestoreapi.com"
+FAQ_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_data.json")
+MIN_FAQ_WORDS = 2
+RESPONSE_CACHE_SIZE = 4096
+SIMILAR_CACHE_SIZE = 1024
+SIMILARITY_THRESHOLD = 0.9
+GENERATION_CONFIG = {"max_output_tokens": 120, "temperature": 0.4, "top_p": 0.9}
+# Frontend assets are not content-hashed, so they get a bounded max-age;
+# index.html is always revalidated so new deploys show up immediately.
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 3600))
+AI_NOT_CONFIGURED = "AI service is not configured."
+AI_UNAVAILABLE = "I'm unable to answer that right now."
+AI_INTERRUPTED = "\n\n⚠️ The answer was cut off. Please try again."
+
+CLEAN_RE = re.compile(r'[^a-z0-9\s]')
+
+# One scan finds every intent keyword; detect_intent then applies priority order.
+# Keywords match from the start of a word, so inflections ("ordered",
+# "refunded", "cancellation", "buying") and the common prefixed forms
+# ("preorder", "reorder", "nonrefundable") count, while unrelated words that
+# merely contain a keyword ("border", "this", "shipping" for "hi") don't.
+# Price is limited to its real forms so "priceless" isn't a product query.
+INTENT_RE = re.compile(
+    r"\b(?:"
+    r"(?P<greeting>(?:hi|hello|hey)\b)"
+    r"|(?P<order_status>(?:(?:pre|re)?order|status|deliver|shipped)\w*)"
+    r"|(?P<refund>(?:(?:non)?refund|return|cancel)\w*|money back\b)"
+    r"|(?P<product>(?:product|buy)\w*|pric(?:e|es|ed|ing)\b)"
+    r")"
+)
+INTENT_PRIORITY = ("greeting", "order_status", "refund", "product")
+
+# English stopwords (NLTK-style list; negations are kept since they change meaning)
+STOP_WORDS = frozenset("""
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can could did do does doing
+    down during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more most
+    my myself now of off on once only or other our ours ourselves out over own
+    same she should so some such than that the their theirs them themselves
+    then there these they this those through to too under until up very was we
+    were what when where which while who whom why will with would you your
+    yours yourself yourselves
+""".split())
 
 # ------------------ Initialize Flask ------------------
 app = Flask(__name__, static_folder='../frontend')
 CORS(app)
+Compress(app)
 
 # ------------------ Conversation state ------------------
 conversation_state = {
@@ -31,66 +85,346 @@ def is_order_id(text):
     return text.isdigit() and len(text) >= 3
 
 def detect_intent(text):
-    t = text.lower()
-    if any(w in t for w in ["hi", "hello", "hey"]):
-        return "greeting"
-    if any(w in t for w in ["order", "status", "delivery", "shipped", "delivered"]):
-        return "order_status"
-    if any(w in t for w in ["refund", "return", "cancel"]):
-        return "refund"
-    if any(w in t for w in ["product", "products", "price", "buy"]):
-        return "product"
+    found = {m.lastgroup for m in INTENT_RE.finditer(text.lower())}
+    for intent in INTENT_PRIORITY:
+        if intent in found:
+            return intent
     return "general"
 
+# Timestamps are second-resolution, so the formatted string is reused
+# until the clock ticks over instead of being rebuilt per response.
+timestamp_cache = (0, "")
+
+def now_iso():
+    global timestamp_cache
+    second = int(time.time())
+    cached_second, cached_iso = timestamp_cache
+    if second != cached_second:
+        cached_iso = datetime.fromtimestamp(second).isoformat()
+        timestamp_cache = (second, cached_iso)
+    return cached_iso
+
+def tokenize(text):
+    return CLEAN_RE.sub('', text.lower()).split()
+
+def preprocess_text(text):
+    return [t for t in tokenize(text) if t not in STOP_WORDS]
+
+# ------------------ FAQ index ------------------
+# FAQs are static, so they are parsed once at startup into an inverted
+# index: each word maps to the FAQs it scores for, so a query only touches
+# the FAQs it shares words with instead of scanning every entry.
+# Single-word keywords are matched against the message's word set and
+# multi-word phrases against its space-joined tokens, so both only hit on
+# whole words. Keywords made only of stopwords ("where", "when") are
+# skipped since they say nothing about which FAQ is meant.
+# FAQ_ANSWERS holds (response, follow_up intent or None) per FAQ.
+FAQ_ANSWERS = []
+FAQ_QUESTION_INDEX = {}
+FAQ_KEYWORD_INDEX = {}
+FAQ_PHRASES = []
+
+def load_faqs():
+    global FAQ_ANSWERS, FAQ_QUESTION_INDEX, FAQ_KEYWORD_INDEX, FAQ_PHRASES
+    try:
+        with open(FAQ_FILE, encoding="utf-8") as f:
+            faqs = json.load(f)["faqs"]
+    except Exception as e:
+        print("FAQ load error:", e)
+        faqs = []
+
+    answers, question_index, keyword_index, phrases = [], {}, {}, []
+    for i, faq in enumerate(faqs):
+        answers.append((faq["response"], faq.get("follow_up")))
+        for token in set(preprocess_text(faq["question"])):
+            question_index.setdefault(token, []).append(i)
+        for words in {tuple(tokenize(k)) for k in faq["keywords"]}:
+            if all(w in STOP_WORDS for w in words):
+                continue
+            if len(words) == 1:
+                keyword_index.setdefault(words[0], []).append(i)
+            else:
+                phrases.append((f" {' '.join(words)} ", words, i))
+
+    FAQ_ANSWERS, FAQ_QUESTION_INDEX, FAQ_KEYWORD_INDEX, FAQ_PHRASES = (
+        answers, question_index, keyword_index, phrases
+    )
+
+def match_faq(user_message):
+    """Return the best (response, follow_up) FAQ answer, or None.
+
+    An FAQ scores one point per distinct message word it matches, whether
+    through its question, a keyword or a phrase. One shared word ("policy",
+    "code", "account") is too weak to override Gemini, so a match needs at
+    least MIN_FAQ_WORDS distinct words.
+    """
+    words = tokenize(user_message)
+    user_text = f" {' '.join(words)} "
+    user_words = frozenset(words)
+    user_tokens = user_words - STOP_WORDS
+
+    matched = {}
+    for token in user_tokens:
+        for i in FAQ_QUESTION_INDEX.get(token, ()):
+            matched.setdefault(i, set()).add(token)
+    for word in user_words:
+        for i in FAQ_KEYWORD_INDEX.get(word, ()):
+            matched.setdefault(i, set()).add(word)
+    for phrase, phrase_words, i in FAQ_PHRASES:
+        if phrase in user_text:
+            matched.setdefault(i, set()).update(phrase_words)
+
+    if not matched:
+        return None
+    # Most distinct words wins; ties go to the FAQ listed first
+    best = min(matched, key=lambda i: (-len(matched[i]), i))
+    if len(matched[best]) < MIN_FAQ_WORDS:
+        return None
+    return FAQ_ANSWERS[best]
+
+load_faqs()
+
+# ------------------ Response cache ------------------
+# Exact-match LRU cache for Gemini replies, keyed by the normalized
+# message so repeated questions skip the API call entirely.
+RESPONSE_CACHE = OrderedDict()
+RESPONSE_CACHE_LOCK = threading.Lock()
+
+def cache_key(user_message):
+    # Only case and whitespace are normalized: symbols are part of the
+    # question ("2+2" vs "2-2", "c#" vs "c++") and must not be merged.
+    return " ".join(user_message.lower().split())
+
+def get_cached_response(key):
+    with RESPONSE_CACHE_LOCK:
+        response = RESPONSE_CACHE.get(key)
+        if response is not None:
+            RESPONSE_CACHE.move_to_end(key)
+        return response
+
+def cache_response(key, response):
+    if not key or response in (AI_NOT_CONFIGURED, AI_UNAVAILABLE):
+        return
+    with RESPONSE_CACHE_LOCK:
+        RESPONSE_CACHE[key] = response
+        RESPONSE_CACHE.move_to_end(key)
+        if len(RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+            RESPONSE_CACHE.popitem(last=False)
+
+# ------------------ Similarity cache ------------------
+# Near-duplicate cache for Gemini answers: a question whose words and word
+# pairs overlap a cached one by more than SIMILARITY_THRESHOLD (Jaccard)
+# reuses that answer instead of calling the API again. Word pairs make the
+# comparison order-sensitive, and two questions that differ by a negation
+# are never treated as the same question.
+SIMILAR_CACHE = OrderedDict()
+SIMILAR_CACHE_LOCK = threading.Lock()
+NEGATIONS = frozenset(word for n in """
+    no not nor never none nothing without cannot can't don't doesn't didn't
+    isn't aren't wasn't weren't won't wouldn't shouldn't couldn't haven't
+    hasn't hadn't
+""".split() for word in (n, n.replace("'", "")))
+# Trimmed from word edges only, so "c++", "c#" and "2+2" stay distinct
+EDGE_PUNCTUATION = ".,!?;:\"'()[]{}"
+
+def similarity_features(user_message):
+    words = user_message.lower().replace("’", "'").split()
+    words = [w for w in (w.strip(EDGE_PUNCTUATION) for w in words) if w]
+    return frozenset(words) | frozenset(zip(words, words[1:]))
+
+def find_similar_response(features):
+    if not features:
+        return None
+    with SIMILAR_CACHE_LOCK:
+        best_key, best_score = None, 0.0
+        size = len(features)
+        for cached_features in SIMILAR_CACHE:
+            overlap = len(features & cached_features)
+            if not overlap or (features ^ cached_features) & NEGATIONS:
+                continue
+            score = overlap / (size + len(cached_features) - overlap)
+            if score > best_score:
+                best_key, best_score = cached_features, score
+        if best_score <= SIMILARITY_THRESHOLD:
+            return None
+        SIMILAR_CACHE.move_to_end(best_key)
+        return SIMILAR_CACHE[best_key]
+
+def cache_similar_response(features, response):
+    if not features:
+        return
+    with SIMILAR_CACHE_LOCK:
+        SIMILAR_CACHE[features] = response
+        SIMILAR_CACHE.move_to_end(features)
+        if len(SIMILAR_CACHE) > SIMILAR_CACHE_SIZE:
+            SIMILAR_CACHE.popitem(last=False)
+
 # ------------------ External API ------------------
+# One pooled session keeps FakeStore connections alive across requests
+# instead of paying a new TCP + TLS handshake per call.
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+
 def get_products():
     try:
-        r = requests.get(f"{FAKESTORE_API}/products", timeout=5)
+        r = HTTP_SESSION.get(f"{FAKESTORE_API}/products", timeout=5)
         r.raise_for_status()
         return r.json()
     except Exception as e:
         print("Product API error:", e)
         return None
 
+# Product details are effectively static; only successful lookups are
+# cached since lru_cache does not store calls that raise.
+@lru_cache(maxsize=128)
+def fetch_product(pid):
+    r = HTTP_SESSION.get(f"{FAKESTORE_API}/products/{pid}", timeout=5)
+    r.raise_for_status()
+    return r.json()
+
 def get_product_by_id(pid):
     try:
-        r = requests.get(f"{FAKESTORE_API}/products/{pid}", timeout=5)
-        r.raise_for_status()
-        return r.json()
+        return fetch_product(pid)
     except Exception as e:
         print("Product ID API error:", e)
         return None
 
 # ------------------ Gemini fallback ------------------
+# Configured once at import; GEMINI_MODEL stays None without an API key.
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+GEMINI_MODEL = None
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+    GEMINI_MODEL = genai.GenerativeModel("gemini-pro")
+
+def build_prompt(user_message):
+    return f"You are a concise e-commerce support agent. Reply in at most 2 sentences.\nUser: {user_message}"
+
+# Identical questions that arrive while a Gemini call for them is still
+# running wait on that call's Future for its final text instead of issuing
+# their own request. This covers both /chat and /chat_stream, since the
+# blocking path is built on the streaming one.
+INFLIGHT_AI_CALLS = {}
+INFLIGHT_AI_LOCK = threading.Lock()
+
+def find_cached_ai_answer(user_message):
+    """Return (similarity features, cached answer or None) for a Gemini question."""
+    features = similarity_features(user_message)
+    return features, find_similar_response(features)
+
+def remember_ai_answer(user_message, features, answer):
+    if answer and answer not in (AI_NOT_CONFIGURED, AI_UNAVAILABLE):
+        cache_similar_response(features, answer)
+        cache_response(cache_key(user_message), answer)
+
 def generate_ai_response(user_message):
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        return "AI service is not configured."
+    return "".join(stream_ai_response(user_message)).strip()
+
+def stream_ai_response(user_message):
+    """Yield the Gemini answer chunk by chunk as it is generated."""
+    if GEMINI_MODEL is None:
+        yield AI_NOT_CONFIGURED
+        return
+
+    features, cached = find_cached_ai_answer(user_message)
+    if cached is not None:
+        yield cached
+        return
 
-    genai.configure(api_key=api_key)
+    key = cache_key(user_message)
+    with INFLIGHT_AI_LOCK:
+        future = INFLIGHT_AI_CALLS.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = INFLIGHT_AI_CALLS[key] = Future()
 
+    if not is_owner:
+        yield future.result()
+        return
+
+    parts = []
+    answer = AI_UNAVAILABLE
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(
-            f"""
-You are a customer support assistant.
-Be helpful and clear.
-User: {user_message}
-"""
-        )
-        return response.text.strip()
+        for chunk in GEMINI_MODEL.generate_content(
+            build_prompt(user_message), generation_config=GENERATION_CONFIG, stream=True
+        ):
+            text = chunk.text if parts else chunk.text.lstrip()
+            if text:
+                parts.append(text)
+                yield text
+        answer = "".join(parts).strip() or AI_UNAVAILABLE
     except Exception as e:
         print("Gemini error:", e)
-        return "I'm unable to answer that right now."
+        # Don't let a half-sent answer look complete
+        yield AI_INTERRUPTED if parts else AI_UNAVAILABLE
+    finally:
+        # Always resolve so waiters never block, even if this client
+        # disconnected mid-stream; they get the full answer or AI_UNAVAILABLE.
+        with INFLIGHT_AI_LOCK:
+            INFLIGHT_AI_CALLS.pop(key, None)
+        future.set_result(answer)
 
-# ------------------ Chat Route ------------------
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.get_json()
-    user_message = data.get("message", "").strip()
+    remember_ai_answer(user_message, features, answer)
 
-    if not user_message:
-        return jsonify({"response": "Please enter a message."})
+# ------------------ Intent handlers ------------------
+# Each handler returns (response, next last_intent). A None response from
+# answer_general means the message should go to the Gemini fallback.
+GREETING_REPLY = "Hi 👋 How can I help you today?"
+ORDER_ID_PROMPT = "📦 Please provide your order ID."
+REFUND_ID_PROMPT = "💸 Please provide your order ID to initiate a refund."
+
+def answer_greeting(user_message):
+    return GREETING_REPLY, "greeting"
+
+def answer_order_status(user_message):
+    return ORDER_ID_PROMPT, "order_status"
+
+def answer_refund(user_message):
+    return REFUND_ID_PROMPT, "refund"
+
+def answer_product(user_message):
+    products = get_products()
+    if not products:
+        return "⚠️ Unable to fetch products right now.", None
+    response = "🛍️ Available products:\n"
+    for p in products[:5]:
+        response += f"\nID {p['id']} – {p['title']} (₹{int(p['price'] * 80)})"
+    response += "\n\nType: product <id>"
+    return response, None
+
+def answer_general(user_message):
+    response = get_cached_response(cache_key(user_message))
+    if response is not None:
+        return response, None
+
+    faq = match_faq(user_message)
+    if faq is None:
+        return None, None
+    response, follow_up = faq
+    # An FAQ that asks for an order ID keeps the lookup waiting for it;
+    # the product follow-up is answered by the product handler. Refunds
+    # change state, so they are only ever armed by an explicit refund
+    # intent (answer_refund), never by an FAQ answer.
+    if follow_up == "order_status":
+        return response, follow_up
+    if follow_up == "product":
+        return answer_product(user_message)
+    return response, None
+
+INTENT_HANDLERS = {
+    "greeting": answer_greeting,
+    "order_status": answer_order_status,
+    "refund": answer_refund,
+    "product": answer_product,
+}
+
+# ------------------ Chat logic ------------------
+def reply(user_message):
+    """Return the bot's reply, or None if the message needs the Gemini fallback."""
 
     # ---------- Product by ID ----------
     if user_message.lower().startswith("product"):
@@ -98,15 +432,13 @@ def chat():
         if len(parts) == 2 and parts[1].isdigit():
             product = get_product_by_id(parts[1])
             if product:
-                return jsonify({
-                    "response": (
-                        f"🛍️ {product['title']}\n"
-                        f"💰 Price: ₹{int(product['price'] * 80)}\n"
-                        f"⭐ Rating: {product['rating']['rate']}\n"
-                        f"📝 {product['description']}"
-                    )
-                })
-            return jsonify({"response": "❌ Product not found."})
+                return (
+                    f"🛍️ {product['title']}\n"
+                    f"💰 Price: ₹{int(product['price'] * 80)}\n"
+                    f"⭐ Rating: {product['rating']['rate']}\n"
+                    f"📝 {product['description']}"
+                )
+            return "❌ Product not found."
 
     # ---------- Multi-turn: Order ----------
     if conversation_state["last_intent"] == "order_status":
@@ -114,15 +446,13 @@ def chat():
             order = mock_orders.get(user_message)
             if order:
                 conversation_state["last_intent"] = None
-                return jsonify({
-                    "response": (
-                        f"📦 Order {user_message}\n"
-                        f"Status: {order['status']}\n"
-                        f"Delivery: {order['delivery']}\n"
-                        f"Items: {', '.join(order['items'])}"
-                    )
-                })
-            return jsonify({"response": "❌ Invalid order ID. Try again."})
+                return (
+                    f"📦 Order {user_message}\n"
+                    f"Status: {order['status']}\n"
+                    f"Delivery: {order['delivery']}\n"
+                    f"Items: {', '.join(order['items'])}"
+                )
+            return "❌ Invalid order ID. Try again."
 
     # ---------- Multi-turn: Refund ----------
     if conversation_state["last_intent"] == "refund":
@@ -130,61 +460,70 @@ def chat():
             if user_message in mock_orders:
                 mock_refunds[user_message] = "Initiated"
                 conversation_state["last_intent"] = None
-                return jsonify({
-                    "response": f"✅ Refund initiated for order {user_message}."
-                })
-            return jsonify({"response": "❌ Order not found."})
+                return f"✅ Refund initiated for order {user_message}."
+            return "❌ Order not found."
 
     # ---------- Intent detection ----------
     intent = detect_intent(user_message)
-    conversation_state["last_intent"] = intent
+    handler = INTENT_HANDLERS.get(intent, answer_general)
+    response, conversation_state["last_intent"] = handler(user_message)
+    return response
 
-    if intent == "greeting":
-        response = "Hi 👋 How can I help you today?"
-
-    elif intent == "order_status":
-        response = "📦 Please provide your order ID."
-
-    elif intent == "refund":
-        response = "💸 Please provide your order ID to initiate a refund."
-
-    elif intent == "product":
-        products = get_products()
-        if not products:
-            response = "⚠️ Unable to fetch products right now."
-        else:
-            response = "🛍️ Available products:\n"
-            for p in products[:5]:
-                response += f"\nID {p['id']} – {p['title']} (₹{int(p['price'] * 80)})"
-            response += "\n\nType: product <id>"
+# ------------------ Chat Routes ------------------
+@app.route('/chat', methods=['POST'])
+def chat():
+    data = request.get_json()
+    user_message = data.get("message", "").strip()
 
-        conversation_state["last_intent"] = None
+    if not user_message:
+        return jsonify({"response": "Please enter a message."})
 
-    else:
-        conversation_state["last_intent"] = None
+    response = reply(user_message)
+    if response is None:
         response = generate_ai_response(user_message)
 
     return jsonify({
         "response": response,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now_iso()
     })
 
+@app.route('/chat_stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but sends the reply as Server-Sent Events so the
+    Gemini fallback is shown token by token instead of all at once."""
+    data = request.get_json()
+    user_message = data.get("message", "").strip()
+
+    if not user_message:
+        chunks = ["Please enter a message."]
+    else:
+        response = reply(user_message)
+        chunks = [response] if response is not None else stream_ai_response(user_message)
+
+    def events():
+        for chunk in chunks:
+            yield f"data: {json.dumps(chunk)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # ------------------ Health ------------------
 @app.route('/health')
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({"status": "healthy", "timestamp": now_iso()})
 
 # ------------------ Frontend ------------------
 @app.route('/')
 def index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(app.static_folder, 'index.html', max_age=0)
 
 @app.route('/<path:path>')
 def static_files(path):
-    return send_from_directory(app.static_folder, path)
+    return send_from_directory(app.static_folder, path, max_age=STATIC_MAX_AGE)
 
 # ------------------ Main ------------------
+# Development server only; use wsgi.py with gunicorn in production.
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 3000))
-    app.run(host="0.0.0.0", port=port)
+    debug = os.environ.get("FLASK_DEBUG", "").lower() in ("1", "true")
+    app.run(host="0.0.0.0", port=port, debug=debug)
 
@@ -0,0 +1,13 @@
+"""WSGI entry point for production servers.
+
+Run from the backend/ directory:
+
+    gunicorn -k gthread -w 1 --threads 8 -b 0.0.0.0:${PORT:-3000} wsgi:app
+
+Conversation state and the response caches live in process memory, so
+scale with threads rather than extra workers (-w) to keep multi-turn
+order/refund flows on the same state.
+"""
+from app import app
+
+__all__ = ["app"]
@@ -1,5 +1,5 @@
 // API endpoint - adjust this to match your Flask backend URL
-const API_URL = 'http://127.0.0.1:5000/chat';
+const API_URL = 'http://127.0.0.1:5000/chat_stream';
 
 // DOM elements
 const chatMessages = document.getElementById('chatMessages');
@@ -58,11 +58,40 @@ async function sendMessage() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
-        
-        // Display bot response
-        addMessage(data.response, 'bot');
-        
+        // Display bot response as it streams in (Server-Sent Events)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let botText = null;
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const event of events) {
+                if (!event.startsWith('data: ')) {
+                    continue;
+                }
+                if (!botText) {
+                    botText = addMessage('', 'bot');
+                    loadingIndicator.style.display = 'none';
+                }
+                botText.textContent += JSON.parse(event.slice(6));
+                scrollToBottom();
+            }
+        }
+
+        // Stream ended without a single event (server error or dropped connection)
+        if (!botText) {
+            throw new Error('Response stream closed without data');
+        }
+
     } catch (error) {
         console.error('Error:', error);
         addMessage(
@@ -79,6 +108,7 @@ async function sendMessage() {
  * Add a message to the chat interface
  * @param {string} text - The message text
  * @param {string} sender - 'user' or 'bot'
+ * @returns {HTMLParagraphElement} The paragraph holding the message text
  */
 function addMessage(text, sender) {
     const messageDiv = document.createElement('div');
@@ -102,6 +132,8 @@ function addMessage(text, sender) {
     
     // Scroll to bottom
     scrollToBottom();
+
+    return textParagraph;
 }
 
 /**